@@ -3,10 +3,13 @@
 from __future__ import annotations
 
 import asyncio
+import codecs
+import functools
 import json
 import os
 import re
 import subprocess
+import sys
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Iterable, Mapping, Sequence
@@ -35,6 +38,9 @@ __all__ = [
     "CriticAgent",
 ]
 
+# Chunk size for relaying a running script's stdout/stderr.
+_SUBPROCESS_READ_BYTES = 65536
+
 
 @dataclass
 class _RunContext:
@@ -42,6 +48,20 @@ class _RunContext:
     iteration: int
 
 
+@functools.lru_cache(maxsize=8)
+def _read_sources_file(path: str) -> str:
+    return Path(path).read_text(encoding="utf-8")
+
+
+def _resolve_sources(sources: str | None, sources_path: str | None) -> str:
+    """Return inline ``sources`` or, when only a path is given, the cached file contents."""
+    if sources is not None:
+        return sources
+    if sources_path:
+        return _read_sources_file(sources_path)
+    return ""
+
+
 class PrincipalInvestigatorAgent(Agent):
     def __init__(self, *, verbose: bool = True, max_rounds: int = 3) -> None:
         super().__init__()
@@ -56,7 +76,15 @@ class PrincipalInvestigatorAgent(Agent):
             self.max_rounds = max_rounds
 
     @action
-    async def create_plan(self, sources: str, topic: str, mode: str, changes: str | None = None) -> dict:
+    async def create_plan(
+        self,
+        sources: str | None,
+        topic: str,
+        mode: str,
+        changes: str | None = None,
+        sources_path: str | None = None,
+    ) -> dict:
+        sources = _resolve_sources(sources, sources_path)
         prompt = prompts.get_pi_plan_prompt(sources, topic, mode, changes)
         plan = await query_llm_async(prompt, temperature=LLM_CONFIG["temperature"]["research"])
 
@@ -92,18 +120,20 @@ class BrowsingAgent(Agent):     #TN: Can add BioMCP here for searching pubmed
         links: Sequence[str] | None = None,
         files_dir_content: str = "",
         include_directory_listing: bool = True,
+        link_content: str = "",
     ) -> str:
         if self.verbose:
             print(f"BrowsingAgent: gathering sources for '{topic}'")
 
         combined_sources: list[str] = []
 
+        # Callers that already fetched their links (e.g. alongside PDF parsing) pass link_content instead.
         if links:
             link_content = await asyncio.get_running_loop().run_in_executor(
                 None, utils.process_links, list(links)
             )
-            if link_content:
-                combined_sources.append(f"Link Content:\n{link_content}")
+        if link_content:
+            combined_sources.append(f"Link Content:\n{link_content}")
 
         if pdf_content:
             combined_sources.append(f"PDF Content:\n{pdf_content}")
@@ -142,8 +172,14 @@ class ResearchAgent(Agent):
 
     @action
     async def draft_document(
-        self, sources: str, topic: str, plan_section: str = "", iteration: int = 0
+        self,
+        sources: str | None,
+        topic: str,
+        plan_section: str = "",
+        iteration: int = 0,
+        sources_path: str | None = None,
     ) -> dict:
+        sources = _resolve_sources(sources, sources_path)
         prompt = prompts.get_only_research_draft_prompt(sources, topic, plan_section)
         raw_report = await query_llm_async(prompt, temperature=LLM_CONFIG["temperature"]["research"])
         report = utils.clean_report(raw_report)
@@ -171,9 +207,16 @@ class CodeWriterAgent(Agent):
         self.verbose = verbose
 
     @action
-    async def create_coding_plan(self, sources: str, topic: str, plan_section: str = "") -> str:
+    async def create_coding_plan(
+        self,
+        sources: str | None,
+        topic: str,
+        plan_section: str = "",
+        sources_path: str | None = None,
+    ) -> str:
         if self.verbose:
             print("CodeWriterAgent: creating coding plan")
+        sources = _resolve_sources(sources, sources_path)
         prompt = prompts.get_coding_plan_prompt(sources, topic, plan_section)
         return await query_llm_async(prompt, temperature=LLM_CONFIG["temperature"]["coding"])
 
@@ -187,12 +230,14 @@ class CodeWriterAgent(Agent):
     @action
     async def create_code(
         self,
-        sources: str,
+        sources: str | None,
         topic: str,
         plan_section: str,
         coding_plan: str,
         iteration: int,
+        sources_path: str | None = None,
     ) -> dict:
+        sources = _resolve_sources(sources, sources_path)
         prompt = prompts.get_code_writing_prompt(sources, topic, plan_section, coding_plan)
         response = await query_llm_async(prompt, temperature=LLM_CONFIG["temperature"]["coding"])
         code = utils.extract_code_only(response)
@@ -203,8 +248,14 @@ class CodeWriterAgent(Agent):
         return CodeArtifact(code=code, iteration=iteration).to_dict()
 
     @action
-    async def improve_code(self, code: str, feedback: str, iteration: int) -> dict:
-        prompt = prompts.get_code_improve_prompt(code, feedback)
+    async def improve_code(
+        self,
+        code: str,
+        feedback: str,
+        iteration: int,
+        history: list[dict] | None = None,
+    ) -> dict:
+        prompt = prompts.get_code_improve_prompt(code, feedback, history)
         response = await query_llm_async(prompt, temperature=LLM_CONFIG["temperature"]["coding"])
         improved = utils.extract_code_only(response)
         if self.verbose:
@@ -243,18 +294,44 @@ class CodeExecutorAgent(Agent):
         script_path.write_text(code)
         return script_path
 
-    async def _run_subprocess(self, command: Sequence[str], cwd: Path) -> subprocess.CompletedProcess[str]:
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
-            None,
-            lambda: subprocess.run(
-                command,
-                cwd=str(cwd),
-                capture_output=True,
-                text=True,
-            ),
+    async def _run_subprocess(
+        self, command: Sequence[str], cwd: Path, *, echo: bool = False
+    ) -> subprocess.CompletedProcess[str]:
+        """Run ``command`` on the event loop, reading its output as it is produced.
+
+        With ``echo`` the script's stdout/stderr are relayed live instead of only after it exits.
+        """
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            cwd=str(cwd),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
         )
 
+        async def _drain(stream: asyncio.StreamReader, sink) -> str:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            chunks: list[str] = []
+            while data := await stream.read(_SUBPROCESS_READ_BYTES):
+                text = decoder.decode(data)
+                chunks.append(text)
+                if echo and text:
+                    print(text, end="", file=sink, flush=True)
+            chunks.append(decoder.decode(b"", final=True))
+            return "".join(chunks)
+
+        drained = False
+        try:
+            stdout, stderr = await asyncio.gather(
+                _drain(process.stdout, sys.stdout), _drain(process.stderr, sys.stderr)
+            )
+            drained = True
+        finally:
+            # On cancellation or a failed drain, don't leave the child running; always reap it.
+            if not drained and process.returncode is None:
+                process.kill()
+            returncode = await process.wait()
+        return subprocess.CompletedProcess(list(command), returncode, stdout, stderr)
+
     @staticmethod
     def _missing_modules(stderr: str) -> list[str]:
         pattern = re.compile(r"No module named ['\"]([^'\"]+)['\"]")
@@ -292,7 +369,7 @@ class CodeExecutorAgent(Agent):
         if self.verbose:
             print(f"CodeExecutorAgent running script {script_path}")
 
-        result = await self._run_subprocess([python_exe, str(script_path)], workdir)
+        result = await self._run_subprocess([python_exe, str(script_path)], workdir, echo=self.verbose)
         packages_installed: list[str] = []
 
         if result.returncode != 0:
@@ -307,7 +384,9 @@ class CodeExecutorAgent(Agent):
                     print("Installed packages:", installed)
                     print(install_logs)
                 if installed:
-                    result = await self._run_subprocess([python_exe, str(script_path)], workdir)
+                    result = await self._run_subprocess(
+                        [python_exe, str(script_path)], workdir, echo=self.verbose
+                    )
 
         reasoning = None
         if result.returncode != 0:
@@ -761,9 +840,11 @@ class CriticAgent(Agent):
         report: str | None,
         code: str | None,
         execution_result: str | None,
-        sources: str,
+        sources: str | None,
         execution_reasoning: str | None = None,
+        sources_path: str | None = None,
     ) -> dict:
+        sources = _resolve_sources(sources, sources_path)
         report_feedback = None
         code_feedback = None
 
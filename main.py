@@ -52,6 +52,15 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Submit generated code to the HPCAgent (e.g., ALCF Sophia) instead of running locally.",
     )
+    parser.add_argument(
+        "--final_critique",
+        action="store_true",
+        help="Run the CriticAgent on the last iteration too, even though no further round will use it.",
+    )
+    parser.add_argument(
+        "--resume_from",
+        help="Path to a state_<timestamp>.jsonl file from an earlier run; continue after its last completed iteration.",
+    )
     parser.add_argument(
         "--no-verbose",
         dest="verbose",
@@ -72,6 +81,9 @@ def _validate_paths(paths: Sequence[str] | None, kind: str) -> list[str]:
 
 
 async def _run_from_args(args: argparse.Namespace) -> None:
+    if args.resume_from and not Path(args.resume_from).is_file():
+        raise FileNotFoundError(f"State file not found: {args.resume_from}")
+
     pdfs: list[str] = []
     if args.pdfs_dir:
         pdfs_path = Path(args.pdfs_dir)
@@ -92,12 +104,24 @@ async def _run_from_args(args: argparse.Namespace) -> None:
         verbose=True,
         # verbose=args.verbose,
         use_hpc=args.use_hpc,
+        final_critique=args.final_critique,
+        resume_from=args.resume_from,
     )
 
 
+def _install_event_loop_policy() -> None:
+    """Use uvloop's faster event loop when it is installed (not available on Windows)."""
+    try:
+        import uvloop
+    except ImportError:
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
 def main(argv: Sequence[str] | None = None) -> None:
     parser = build_parser()
     args = parser.parse_args(argv)
+    _install_event_loop_policy()
     asyncio.run(_run_from_args(args))
 
 
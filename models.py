@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass, fields
 from typing import Any, Optional
 
 __all__ = [
@@ -20,7 +20,8 @@ class SerializableDataclass:
     """Mixin providing helpers to convert dataclasses to and from plain dicts."""
 
     def to_dict(self) -> dict[str, Any]:
-        return asdict(self)
+        # Fields hold plain values, so a shallow copy avoids asdict()'s recursive deepcopy.
+        return {field.name: getattr(self, field.name) for field in fields(self)}
 
     @classmethod
     def from_dict(cls, data: dict[str, Any]):
@@ -338,11 +338,21 @@ def get_code_writing_prompt(sources: str, topic: str, plan_section: str, coding_
     )
 
 
-def get_code_improve_prompt(code: str, feedback: str) -> str:
+def get_code_improve_prompt(code: str, feedback: str, history: list[dict] | None = None) -> str:
+    history_section = ""
+    if history:
+        history_lines = "\n".join(
+            f"- Iteration {entry['iteration'] + 1}: {entry['feedback']}" for entry in history
+        )
+        history_section = (
+            "Earlier feedback on previous versions of this code (do not repeat fixes that already failed):\n"
+            f"{history_lines}\n\n"
+        )
     return (
         "You are a professional Python developer. Improve the following code based on the user's feedback:\n\n"
         "User Feedback:\n"
         f"\"{feedback}\"\n\n"
+        f"{history_section}"
         "Current Code:\n"
         f"{code}\n\n"
         f"{get_file_path_validation_prompt()}\n"
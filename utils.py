@@ -16,6 +16,11 @@ import PyPDF2
 import io
 import json
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
 
 def save_output(report, code, execution_result, timestamp, iteration):
     # timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -45,21 +50,116 @@ def save_output(report, code, execution_result, timestamp, iteration):
     print(f"\nOutputs saved for iteration {iteration + 1} in {output_dir}")
 
 
-def append_conversation_log(log_path, role, message, iteration=None, metadata=None):
+def _dumps_jsonl(entry):
     """
-    Append a JSON line capturing inter-agent communications for later auditing.
+    Serialize a log entry to a newline-terminated UTF-8 JSON line.
+    Uses orjson when it is installed and falls back to the stdlib otherwise.
+    """
+    if orjson is not None:
+        return orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+    return (json.dumps(entry) + "\n").encode("utf-8")
+
+
+def conversation_log_entry(role, message, iteration=None, metadata=None):
+    """
+    Build the record written to the conversation log for one inter-agent communication.
     """
-    entry = {
+    return {
         "timestamp": datetime.utcnow().isoformat(),
         "role": role,
         "iteration": iteration,
         "message": message,
         "metadata": metadata or {},
     }
+
+
+def write_conversation_log_batch(handle, entries):
+    """
+    Write several conversation log entries to an open binary handle with a single write and flush.
+    """
+    handle.write(b"".join(_dumps_jsonl(entry) for entry in entries))
+    handle.flush()
+
+
+def append_conversation_log(log_path, role, message, iteration=None, metadata=None):
+    """
+    Append a JSON line capturing inter-agent communications for later auditing.
+    """
+    entry = conversation_log_entry(role, message, iteration, metadata)
     path = Path(log_path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as handle:
-        handle.write(json.dumps(entry) + "\n")
+    with path.open("ab") as log_file:
+        log_file.write(_dumps_jsonl(entry))
+
+
+def append_iteration_state(state_path, state):
+    """
+    Append one iteration's workflow state as a JSON line so an interrupted run can be resumed.
+    """
+    path = Path(state_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("ab") as state_file:
+        state_file.write(_dumps_jsonl(state))
+
+
+def load_execution_cache(cache_path, max_entries):
+    """
+    Load the ``max_entries`` most recent cached execution results keyed by code digest.
+    Later entries win, a missing file means an empty cache, and a file holding more lines
+    than that is rewritten with only the kept entries.
+    """
+    cache = {}
+    line_count = 0
+    try:
+        with open(cache_path, "rb") as cache_file:
+            for line in cache_file:
+                if not line.strip():
+                    continue
+                line_count += 1
+                try:
+                    record = orjson.loads(line) if orjson is not None else json.loads(line)
+                except ValueError:
+                    # Skip a line left half-written by an interrupted run.
+                    continue
+                cache.pop(record["key"], None)
+                cache[record["key"]] = record["result"]
+                if len(cache) > max_entries:
+                    del cache[next(iter(cache))]
+    except FileNotFoundError:
+        return cache
+    if line_count > len(cache):
+        compacted_path = Path(f"{cache_path}.tmp")
+        with compacted_path.open("wb") as compacted_file:
+            compacted_file.write(
+                b"".join(_dumps_jsonl({"key": key, "result": result}) for key, result in cache.items())
+            )
+        os.replace(compacted_path, cache_path)
+    return cache
+
+
+def append_execution_cache(cache_path, key, result):
+    """
+    Record one execution result in the on-disk execution cache.
+    """
+    with open(cache_path, "ab") as cache_file:
+        cache_file.write(_dumps_jsonl({"key": key, "result": result}))
+
+
+def load_last_iteration_state(state_path):
+    """
+    Return the most recent complete iteration state recorded in a state file, or None if it holds none.
+    A final record left half-written by a crash is skipped in favour of the one before it.
+    """
+    with open(state_path, "rb") as state_file:
+        lines = [line for line in state_file if line.strip()]
+    if not lines:
+        return None
+    for line in reversed(lines):
+        try:
+            return orjson.loads(line) if orjson is not None else json.loads(line)
+        except ValueError:
+            continue
+    raise ValueError(f"No complete iteration state record could be read from {state_path}.")
 
 # function to clean up the report to conform to professional standards
 def clean_report(text):
@@ -384,40 +484,61 @@ def explore_files_directory(directory_path):
             return f"Error: Directory {directory_path} does not exist."
         
         file_list = []
-        
-        # Walk through the directory and collect file information
-        for root, dirs, files in os.walk(directory_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                relative_path = os.path.relpath(file_path, directory_path)
-                
+
+        # Walk the tree with os.scandir so each entry's type (and, on Windows, size) comes from
+        # the directory listing itself; the order matches os.walk's top-down traversal.
+        def walk(current_dir, relative_dir):
+            try:
+                with os.scandir(current_dir) as entries:
+                    entries = list(entries)
+            except OSError:
+                return
+            subdirs = []
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+                if is_dir:
+                    # Like os.walk, list symlinked directories but do not descend into them.
+                    if not entry.is_symlink():
+                        subdirs.append((entry.path, relative_path))
+                    continue
+
                 # Get file size
                 try:
-                    file_size = os.path.getsize(file_path)
+                    file_size = entry.stat().st_size
                     size_str = f"{file_size:,} bytes"
                     if file_size > 1024*1024:
                         size_str = f"{file_size/(1024*1024):.1f} MB"
                     elif file_size > 1024:
                         size_str = f"{file_size/1024:.1f} KB"
-                except:
+                except OSError:
                     size_str = "Unknown size"
-                
+
                 file_list.append({
                     'path': relative_path,
                     'size': size_str,
-                    'extension': os.path.splitext(file)[1].lower()
+                    'extension': os.path.splitext(entry.name)[1].lower()
                 })
-        
+            for subdir_path, subdir_relative in subdirs:
+                walk(subdir_path, subdir_relative)
+
+        walk(directory_path, "")
+
         # Create a simple report for LLM analysis
-        report = f"FILES DIRECTORY EXPLORATION\n"
-        report += f"Directory: {directory_path}\n"
-        report += f"Total files found: {len(file_list)}\n\n"
-        report += f"FILE LISTING:\n"
-        report += "-" * 50 + "\n"
-        
-        for file_info in file_list:
-            report += f"{file_info['path']} ({file_info['size']})\n"
-        
+        report_lines = [
+            "FILES DIRECTORY EXPLORATION",
+            f"Directory: {directory_path}",
+            f"Total files found: {len(file_list)}",
+            "",
+            "FILE LISTING:",
+            "-" * 50,
+        ]
+        report_lines.extend(f"{file_info['path']} ({file_info['size']})" for file_info in file_list)
+        report = "\n".join(report_lines) + "\n"
+
         return report
         
     except Exception as e:
@@ -9,7 +9,13 @@ from __future__ import annotations
 """
 
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import functools
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
 from pathlib import Path
 from typing import Sequence
 from datetime import datetime
@@ -17,8 +23,6 @@ from datetime import datetime
 from academy.exchange import LocalExchangeFactory
 from academy.manager import Manager
 
-from pdb import set_trace
-
 try:
     from ..academy_agents import (
         BrowsingAgent,
@@ -49,13 +53,282 @@ except ImportError:
     import utils
 
 
+# Character budgets for excerpts recorded in the conversation log.
+_PLAN_EXCERPT_CHARS = 400
+_PREVIEW_CHARS = 600
+_STREAM_PREVIEW_CHARS = 1000
+
+# Head/tail kept from stdout/stderr when a transcript is fed back into LLM prompts.
+_TRANSCRIPT_HEAD_CHARS = 4000
+_TRANSCRIPT_TAIL_CHARS = 4000
+
+# Retry feedback repeats up to this many attempts, the earlier ones cut down to a shorter head/tail.
+_RETRY_FEEDBACK_ATTEMPTS = 3
+_EARLIER_ATTEMPT_HEAD_CHARS = 1000
+_EARLIER_ATTEMPT_TAIL_CHARS = 1000
+
+# The pool hosts every launched agent (seven, plus the optional HPCAgent) and, on top of those,
+# the run's concurrent blocking calls (ingestion, saves, state and cache writes).
+_BASE_AGENT_COUNT = 7
+_IO_HEADROOM_THREADS = 8
+
+# Most queued conversation log events written in one batch.
+_LOG_BATCH_SIZE = 64
+
+# Earlier improve_code feedback handed back to the CodeWriterAgent so it does not repeat failed fixes.
+_IMPROVE_HISTORY_ENTRIES = 5
+_IMPROVE_HISTORY_CHARS = 800
+
+# Most improve_code results remembered per run for identical (code, feedback) requests.
+_IMPROVE_CACHE_ENTRIES = 64
 
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+# Most successful executions kept in the opt-in cross-run execution cache.
+_EXECUTION_CACHE_ENTRIES = 256
 
+# Section headers used when relaying critic feedback back to the PI.
+_CRITIC_SUMMARY_HEADER = "Overall summary from critic:\n"
+_DOCUMENT_FEEDBACK_HEADER = "Document feedback:\n"
+_CODE_FEEDBACK_HEADER = "Code feedback:\n"
+_EXECUTOR_DIAGNOSTICS_HEADER = "Executor diagnostics:\n"
+_SECTION_SEPARATOR = "\n\n"
+
+
+def _preview(text: str | None, limit: int = _PREVIEW_CHARS) -> str:
+    """Return at most ``limit`` characters of ``text`` for log metadata."""
+    if not text:
+        return ""
+    return text if len(text) <= limit else text[:limit]
+
+
+@functools.lru_cache(maxsize=32)
+def _join_feedback_sections(
+    summary: str | None,
+    document_feedback: str | None,
+    code_feedback: str | None,
+    executor_feedback: str | None,
+) -> str | None:
+    """Join the non-empty critic sections; memoized since feedback often repeats across rounds."""
+    sections: list[str] = []
+    if summary:
+        sections.append(_CRITIC_SUMMARY_HEADER + summary)
+    if document_feedback:
+        sections.append(_DOCUMENT_FEEDBACK_HEADER + document_feedback)
+    if code_feedback:
+        sections.append(_CODE_FEEDBACK_HEADER + code_feedback)
+    if executor_feedback:
+        sections.append(_EXECUTOR_DIAGNOSTICS_HEADER + executor_feedback)
+    return _SECTION_SEPARATOR.join(sections) if sections else None
+
+
+# stderr signatures of environment failures that rewriting the script cannot fix.
+_FATAL_STDERR_PATTERNS = tuple(
+    re.compile(pattern)
+    for pattern in (
+        r"CUDA error: no CUDA-capable device is detected",
+        r"No CUDA GPUs are available",
+        r"Connection refused",
+        r"Temporary failure in name resolution",
+        r"No space left on device",
+        r"Disk quota exceeded",
+    )
+)
 
-async def _to_thread(func, *args):
+
+def _fatal_failure_signature(stderr: str | None) -> str | None:
+    """Return the matched text when ``stderr`` shows a failure that code changes cannot fix."""
+    if not stderr:
+        return None
+    for pattern in _FATAL_STDERR_PATTERNS:
+        match = pattern.search(stderr)
+        if match:
+            return match.group(0)
+    return None
+
+
+def _digest(text: str) -> str:
+    """Short content hash used to key per-run caches."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _truncate_middle(
+    text: str | None, head: int = _TRANSCRIPT_HEAD_CHARS, tail: int = _TRANSCRIPT_TAIL_CHARS
+) -> str:
+    """Keep the start and end of long output (where setup info and tracebacks live)."""
+    if not text:
+        return ""
+    if len(text) <= head + tail + 64:
+        return text
+    elided = len(text) - head - tail
+    return f"{text[:head]}\n...[{elided} characters elided]...\n{text[-tail:]}"
+
+
+def _local_transcript(result: ExecutionResult, *, truncate: bool = True) -> str:
+    """Render a local execution attempt; truncated for LLM prompts, full for the saved record."""
+    clip = _truncate_middle if truncate else (lambda text: text or "")
+    return "".join(
+        [
+            "SUCCESS: ",
+            str(result.success),
+            "\nSTDOUT:\n",
+            clip(result.stdout),
+            "\n\nSTDERR:\n",
+            clip(result.stderr),
+            "\n\nPACKAGES_INSTALLED: ",
+            str(result.packages_installed or []),
+            "\n",
+        ]
+    )
+
+
+def _hpc_transcript(result: ExecutionResult, attempt: int, *, truncate: bool = True) -> str:
+    """Render an HPC submission attempt in the same shape as :func:`_local_transcript`."""
+    clip = _truncate_middle if truncate else (lambda text: text or "")
+    return "".join(
+        [
+            "HPC attempt ",
+            str(attempt),
+            ": success=",
+            str(result.success),
+            "\nJOB_ID: ",
+            result.job_id or "unknown",
+            "\nSTDOUT:\n",
+            clip(result.stdout),
+            "\n\nSTDERR:\n",
+            clip(result.stderr),
+            "\n",
+        ]
+    )
+
+
+def _retry_transcript(chunks: list[str]) -> str:
+    """Combine the latest attempt's transcript with abridged copies of the attempts just before it."""
+    earlier = chunks[-_RETRY_FEEDBACK_ATTEMPTS:-1]
+    if not earlier:
+        return chunks[-1]
+    parts = ["Earlier attempts this iteration (abridged):\n"]
+    for chunk in earlier:
+        parts.append(_truncate_middle(chunk, _EARLIER_ATTEMPT_HEAD_CHARS, _EARLIER_ATTEMPT_TAIL_CHARS))
+        parts.append("\n")
+    parts.append("\nLatest attempt:\n")
+    parts.append(chunks[-1])
+    return "".join(parts)
+
+
+def _thread_pool_size(agent_count: int, requested: int | None = None) -> int:
+    """Size the agent/blocking-I/O pool.
+
+    ``requested`` (or ``AGENTIC_IO_THREADS``) overrides the CPU-based default, but never below one
+    thread per launched agent plus headroom for the run's concurrent blocking calls.
+    """
+    minimum = agent_count + _IO_HEADROOM_THREADS
+    if requested is None:
+        override = os.environ.get("AGENTIC_IO_THREADS")
+        if override:
+            try:
+                requested = int(override)
+            except ValueError:
+                raise ValueError(f"AGENTIC_IO_THREADS must be an integer, got {override!r}.") from None
+    if requested is None:
+        return max(minimum, 32, min(200, 8 * (os.cpu_count() or 1)))
+    if requested < minimum:
+        print(
+            f"Warning: {requested} worker threads cannot host {agent_count} agents and the run's "
+            f"blocking calls; using {minimum}."
+        )
+    return max(minimum, requested)
+
+
+def _restore_state(cls, data: dict | None):
+    """Rebuild a model from a saved iteration state entry, keeping missing entries as None."""
+    return cls.from_dict(data) if data else None
+
+
+async def _to_thread(func, *args, executor: Executor | None = None):
+    """Run a blocking call on ``executor`` (the loop default when None).
+
+    Unlike ``asyncio.to_thread`` this skips copying the contextvars context on every call.
+    """
     loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, func, *args)
+    return await loop.run_in_executor(executor, func, *args)
+
+
+class WorkflowRuntime:
+    """Thread pool, Academy manager and launched agents shared across ``run_workflow`` calls.
+
+    Use it as ``async with WorkflowRuntime() as runtime`` and pass ``runtime=runtime`` to each
+    ``run_workflow`` call so agent launches and thread start-up are paid once, not per run.
+    """
+
+    def __init__(self, *, use_hpc: bool = False, max_workers: int | None = None) -> None:
+        self.use_hpc = use_hpc
+        self.executor = ThreadPoolExecutor(
+            max_workers=_thread_pool_size(_BASE_AGENT_COUNT + int(use_hpc), max_workers),
+            thread_name_prefix="agentic-io",
+        )
+        self._stack = contextlib.AsyncExitStack()
+        self._closed = False
+        self.pi = None
+        self.browsing = None
+        self.research = None
+        self.code_writer = None
+        self.code_executor = None
+        self.code_reviewer = None
+        self.critic = None
+        self.hpc_agent = None
+
+    async def __aenter__(self) -> WorkflowRuntime:
+        manager = await self._stack.enter_async_context(
+            await Manager.from_exchange_factory(
+                factory=LocalExchangeFactory(), executors=self.executor  #TN: can replace LocalExchangeFactory with ProxyStoreExchangeFactory for connecting to cluster?
+            )
+        )
+        try:
+            # Launches are independent of one another, so bring the agents up concurrently.
+            launches = [
+                manager.launch(PrincipalInvestigatorAgent),
+                manager.launch(BrowsingAgent),
+                manager.launch(ResearchAgent),
+                manager.launch(CodeWriterAgent),
+                manager.launch(CodeExecutorAgent),
+                manager.launch(CodeReviewerAgent),
+                manager.launch(CriticAgent),
+            ]
+            if self.use_hpc:
+                launches.append(manager.launch(HPCAgent))
+            (
+                self.pi,
+                self.browsing,
+                self.research,
+                self.code_writer,
+                self.code_executor,
+                self.code_reviewer,
+                self.critic,
+                *optional_agents,
+            ) = await asyncio.gather(*launches)
+            self.hpc_agent = optional_agents[0] if optional_agents else None
+        except BaseException:
+            await self.aclose()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Shut down the launched agents, the manager and the thread pool (once)."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            await self._stack.aclose()
+        finally:
+            # Join the pool so in-flight saves and reads finish. The join runs on a one-off thread so
+            # the loop keeps running and its default executor is never created.
+            shutdown_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agentic-shutdown")
+            try:
+                await _to_thread(self.executor.shutdown, True, executor=shutdown_executor)
+            finally:
+                shutdown_executor.shutdown(wait=False)
 
 
 async def run_workflow(
@@ -69,6 +342,9 @@ async def run_workflow(
     conda_env: str | None,
     verbose: bool = True,
     use_hpc: bool = False,
+    final_critique: bool = False,
+    runtime: WorkflowRuntime | None = None,
+    resume_from: str | None = None,
 ) -> None:
     
     def _format_pi_changes(feedback: CritiqueBundle | None) -> str | None:
@@ -76,128 +352,372 @@ async def run_workflow(
         if not feedback:
             return None
 
-        sections: list[str] = []
-        if feedback.summary:
-            sections.append(f"Overall summary from critic:\n{feedback.summary}")
-        if feedback.document_feedback:
-            sections.append(f"Document feedback:\n{feedback.document_feedback}")
-        if feedback.code_feedback:
-            sections.append(f"Code feedback:\n{feedback.code_feedback}")
-        executor_notes = getattr(feedback, "executor_feedback", None)
-        if executor_notes:
-            sections.append(f"Executor diagnostics:\n{executor_notes}")
-        return "\n\n".join(sections) if sections else None
-
-    # Read content from the pdfs
-    pdf_content = ""
-    if pdfs:
-        pdf_content = await _to_thread(utils.process_pdfs, list(pdfs))
-    # set_trace()
-
-    # Read files from files_dir
-    files_dir_content = ""
-    if files_dir:
-        files_dir_content = await _to_thread(utils.explore_files_directory, files_dir)
+        # Drop the sections for the path this mode never runs so they cannot trigger a replan.
+        include_document = mode != "code_only"
+        include_code = mode != "research_only"
+        return _join_feedback_sections(
+            feedback.summary,
+            feedback.document_feedback if include_document else None,
+            feedback.code_feedback if include_code else None,
+            getattr(feedback, "executor_feedback", None) if include_code else None,
+        )
+
+    # Without a caller-supplied runtime, this run creates (and later tears down) its own.
+    owns_runtime = runtime is None
+    if runtime is None:
+        runtime = WorkflowRuntime(use_hpc=use_hpc)
+    elif use_hpc and not runtime.use_hpc:
+        raise ValueError("use_hpc=True requires a WorkflowRuntime created with use_hpc=True.")
+    # One pool backs both the agents and every blocking call, so nothing touches the loop's default executor.
+    executor = runtime.executor
+    # Human prompts can block for minutes, so they get their own thread instead of a pool worker.
+    console_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agentic-console")
+
+    async def _ainput(prompt: str) -> str:
+        return await _to_thread(input, prompt, executor=console_executor)
+
+    resume_state = None
+    if resume_from:
+        try:
+            resume_state = await _to_thread(utils.load_last_iteration_state, resume_from, executor=executor)
+            if resume_state is None:
+                raise ValueError(f"No iteration state recorded in {resume_from}.")
+            if resume_state.get("completed"):
+                raise ValueError(f"The run recorded in {resume_from} already finished; there is nothing to resume.")
+        except BaseException:
+            console_executor.shutdown(wait=False)
+            if owns_runtime:
+                await runtime.aclose()
+            raise
 
     workspace_root = Path.cwd() / "workspace_runs"
     workspace_root.mkdir(exist_ok=True)
-    run_dir = workspace_root / f"run_{timestamp}"
-    run_dir.mkdir(exist_ok=True)
+    # Stamp each run on its own so repeated or concurrent calls in one process never share outputs.
+    base_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = base_timestamp
+    suffix = 1
+    while True:
+        run_dir = workspace_root / f"run_{timestamp}"
+        try:
+            run_dir.mkdir()
+            break
+        except FileExistsError:
+            suffix += 1
+            timestamp = f"{base_timestamp}_{suffix}"
     conversation_log_path = run_dir / f"conversation_log_{timestamp}.jsonl"
+    state_path = run_dir / f"state_{timestamp}.jsonl"
     hpc_script_counter = 0
+    last_script_digest: str | None = None
+    last_script_path: Path | None = None
 
     def _materialize_hpc_script(code: str, iteration_idx: int) -> Path:
-        nonlocal hpc_script_counter
+        nonlocal hpc_script_counter, last_script_digest, last_script_path
+        # Resubmitting identical code reuses the script already on disk.
+        code_digest = _digest(code)
+        if code_digest == last_script_digest and last_script_path is not None:
+            return last_script_path
         hpc_script_counter += 1
         scripts_dir = run_dir / "generated_code"
         scripts_dir.mkdir(exist_ok=True)
         script_path = scripts_dir / f"hpc_iteration_{iteration_idx:02d}_{hpc_script_counter:02d}.py"
         script_path.write_text(code)
+        last_script_digest = code_digest
+        last_script_path = script_path
         return script_path
 
+    # Events are queued without blocking the loop; a background task writes them in batches.
+    log_queue: asyncio.Queue = asyncio.Queue()
+
     def _log_event(role: str, message: str, iteration_idx: int | None = None, metadata: dict | None = None) -> None:
-        utils.append_conversation_log(
-            log_path=conversation_log_path,
-            role=role,
-            message=message,
-            iteration=iteration_idx,
-            metadata=metadata or {},
+        log_queue.put_nowait(
+            utils.conversation_log_entry(
+                role=role,
+                message=message,
+                iteration=iteration_idx,
+                metadata=metadata or {},
+            )
+        )
+
+    async def _log_writer() -> None:
+        while True:
+            batch = [await log_queue.get()]
+            while not log_queue.empty() and len(batch) < _LOG_BATCH_SIZE:
+                batch.append(log_queue.get_nowait())
+            entries = [entry for entry in batch if entry is not None]
+            if entries:
+                await _to_thread(
+                    utils.write_conversation_log_batch, conversation_log_handle, entries, executor=log_executor
+                )
+            if batch[-1] is None:
+                return
+
+    async def _save_iteration_outputs(iteration_idx: int, report: str, code: str, execution_text: str) -> None:
+        await _to_thread(
+            utils.save_output, report, code, execution_text, timestamp, iteration_idx, executor=executor
         )
+        _log_event(
+            "Orchestrator",
+            "Saved iteration artifacts.",
+            iteration_idx,
+            {"timestamp": timestamp},
+        )
+
+    # Iteration artifacts are written in the background so disk I/O overlaps the next LLM call.
+    pending_saves: list[asyncio.Task] = []
+
+    # Read the pdfs and files_dir and fetch the links concurrently with each other and with agent
+    # startup; none of them is needed until the sources are gathered. A quick search uses none of them.
+    async def _no_content() -> str:
+        return ""
+
+    ingestion: asyncio.Future | None = None
+    if not quick_search:
+        ingestion = asyncio.gather(
+            _to_thread(utils.process_pdfs, list(pdfs), executor=executor) if pdfs else _no_content(),
+            _to_thread(utils.explore_files_directory, files_dir, executor=executor)
+            if files_dir
+            else _no_content(),
+            _to_thread(utils.process_links, list(links), executor=executor) if links else _no_content(),
+        )
+
+    # Keep the conversation log open for the whole run instead of reopening it per event. Its
+    # writes get their own thread so the final flush still works after the runtime's pool shuts down.
+    conversation_log_handle = conversation_log_path.open("ab")
+    log_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agentic-log")
+    log_writer_task = asyncio.create_task(_log_writer())
+    # Agent configure calls; any still in flight when the run fails are settled before teardown.
+    config_tasks: list[asyncio.Task] = []
+    try:
+        if verbose:
+            print("Workspace for generated scripts:", run_dir)
 
-    if verbose:
-        print("Workspace for generated scripts:", run_dir)
-
-    executor = ThreadPoolExecutor(max_workers=8)
-    async with await Manager.from_exchange_factory(
-        factory=LocalExchangeFactory(), executors=executor  #TN: can replace LocalExchangeFactory with ProxyStoreExchangeFactory for connecting to cluster?
-    ) as manager:
-        pi = await manager.launch(PrincipalInvestigatorAgent)
-        browsing = await manager.launch(BrowsingAgent)
-        research = await manager.launch(ResearchAgent)
-        code_writer = await manager.launch(CodeWriterAgent)
-        code_executor = await manager.launch(CodeExecutorAgent)
-        code_reviewer = await manager.launch(CodeReviewerAgent)
-        critic = await manager.launch(CriticAgent)
-        hpc_agent = await manager.launch(HPCAgent) if use_hpc else None
-
-        tasks = [
-            pi.configure(verbose=verbose, max_rounds=MAX_ROUNDS),
-            browsing.set_verbose(verbose),
-            research.set_verbose(verbose),
-            code_writer.set_verbose(verbose),
-            code_executor.set_verbose(verbose),
-            code_reviewer.set_verbose(verbose),
-            critic.set_verbose(verbose),
+        # An owned runtime starts here and is closed once, in the finally block below.
+        if owns_runtime:
+            await runtime.__aenter__()
+        pi = runtime.pi
+        browsing = runtime.browsing
+        research = runtime.research
+        code_writer = runtime.code_writer
+        code_executor = runtime.code_executor
+        code_reviewer = runtime.code_reviewer
+        critic = runtime.critic
+        hpc_agent = runtime.hpc_agent if use_hpc else None
+
+        # Configure agents in the background: only the BrowsingAgent is needed before the
+        # sources are gathered, and the rest are awaited before planning starts.
+        browsing_ready = asyncio.create_task(browsing.set_verbose(verbose))
+        config_tasks += [
+            browsing_ready,
+            asyncio.create_task(pi.configure(verbose=verbose, max_rounds=MAX_ROUNDS)),
+            asyncio.create_task(research.set_verbose(verbose)),
+            asyncio.create_task(code_writer.set_verbose(verbose)),
+            asyncio.create_task(code_executor.set_verbose(verbose)),
+            asyncio.create_task(code_reviewer.set_verbose(verbose)),
+            asyncio.create_task(critic.set_verbose(verbose)),
         ]
         if hpc_agent:
-            tasks.append(hpc_agent.set_verbose(verbose))
-        await asyncio.gather(*tasks)
+            config_tasks.append(asyncio.create_task(hpc_agent.set_verbose(verbose)))
 
+        await browsing_ready
         if quick_search:
             search_result = await browsing.quick_search(topic)
             print(search_result)
+            await asyncio.gather(*config_tasks)
             return
 
+        pdf_content, files_dir_content, link_content = await ingestion
         sources = await browsing.gather_sources(
             topic=topic,
             pdf_content=pdf_content,
-            links=list(links) if links else None,
             files_dir_content=files_dir_content,
+            link_content=link_content,
         )
+        await asyncio.gather(*config_tasks)
+        # Persist the digest once so agents load it by reference instead of receiving it on every call.
+        sources_path = run_dir / "sources.txt"
+        await _to_thread(sources_path.write_text, sources, "utf-8", executor=executor)
+        sources_ref = str(sources_path)
 
-        # Let the PI create the initial plan
-        plan_dict = await pi.create_plan(sources=sources, topic=topic, mode=mode)
-        plan = PlanResult.from_dict(plan_dict)
-        _log_event(
-            "PrincipalInvestigatorAgent",
-            "Initial plan created.",
-            metadata={"plan": plan.plan, "reasoning": plan.reasoning},
-        )
+        if resume_state:
+            # The saved plan already reflects the last completed round's critique.
+            plan = PlanResult.from_dict(resume_state["plan"])
+            _log_event(
+                "Orchestrator",
+                "Resumed from saved iteration state.",
+                metadata={"resume_from": resume_from, "iteration": resume_state["iteration"]},
+            )
+        else:
+            # Let the PI create the initial plan
+            plan_dict = await pi.create_plan(
+                sources=None, sources_path=sources_ref, topic=topic, mode=mode
+            )
+            plan = PlanResult.from_dict(plan_dict)
+            _log_event(
+                "PrincipalInvestigatorAgent",
+                "Initial plan created.",
+                metadata={"plan": plan.plan, "reasoning": plan.reasoning},
+            )
 
-        while True:
-            decision = (await _to_thread(input, "PI: Do you want to proceed with the plan? (y/n): ")).strip().lower()
-            if decision == "y":
-                print("PI: User agreed to the plan.")
-                _log_event("User", "Approved plan.", metadata={"decision": decision})
-                break
-            if decision == "n":
-                changes = await _to_thread(input, "PI: Please input the suggested changes: ")
-                plan_dict = await pi.create_plan(sources=sources, topic=topic, mode=mode, changes=changes)
-                plan = PlanResult.from_dict(plan_dict)
-                _log_event(
-                    "PrincipalInvestigatorAgent",
-                    "Plan updated based on user feedback.",
-                    metadata={"plan": plan.plan, "reasoning": plan.reasoning, "user_changes": changes},
-                )
-                continue
-            print("PI: Invalid input. Please enter 'y' or 'n'.")
+            while True:
+                decision = (await _ainput("PI: Do you want to proceed with the plan? (y/n): ")).strip().lower()
+                if decision == "y":
+                    print("PI: User agreed to the plan.")
+                    _log_event("User", "Approved plan.", metadata={"decision": decision})
+                    break
+                if decision == "n":
+                    changes = await _ainput("PI: Please input the suggested changes: ")
+                    plan_dict = await pi.create_plan(
+                        sources=None,
+                        sources_path=sources_ref,
+                        topic=topic,
+                        mode=mode,
+                        changes=changes,
+                    )
+                    plan = PlanResult.from_dict(plan_dict)
+                    _log_event(
+                        "PrincipalInvestigatorAgent",
+                        "Plan updated based on user feedback.",
+                        metadata={"plan": plan.plan, "reasoning": plan.reasoning, "user_changes": changes},
+                    )
+                    continue
+                print("PI: Invalid input. Please enter 'y' or 'n'.")
 
         research_result: ResearchArtifact | None = None
         code_artifact: CodeArtifact | None = None
         execution_result: ExecutionResult | None = None
         critic_feedback: CritiqueBundle | None = None
+        start_iteration = 0
+        if resume_state:
+            research_result = _restore_state(ResearchArtifact, resume_state["research"])
+            code_artifact = _restore_state(CodeArtifact, resume_state["code"])
+            critic_feedback = _restore_state(CritiqueBundle, resume_state["critic"])
+            start_iteration = resume_state["iteration"] + 1
+        # Digests of (report, code, transcript, reasoning) -> the critique they received this run.
+        critic_cache: dict[tuple[str, ...], CritiqueBundle] = {}
+        last_replan_key: str | None = None
+
+        async def _research_step(
+            iteration_idx: int,
+            plan_text: str,
+            previous: ResearchArtifact | None,
+            feedback_bundle: CritiqueBundle | None,
+        ) -> ResearchArtifact:
+            if iteration_idx == 0 or not previous:
+                research_dict = await research.draft_document(
+                    sources=None,
+                    sources_path=sources_ref,
+                    topic=topic,
+                    plan_section=plan_text,
+                    iteration=iteration_idx,
+                )
+            else:
+                feedback = feedback_bundle.document_feedback if feedback_bundle else ""
+                research_dict = await research.improve_document(
+                    draft=previous.content,
+                    feedback=feedback or "",
+                    iteration=iteration_idx,
+                )
+            artifact = ResearchArtifact.from_dict(research_dict)
+            _log_event(
+                "ResearchAgent",
+                "Produced research draft.",
+                iteration_idx,
+                {"iteration": artifact.iteration, "excerpt": _preview(artifact.content)},
+            )
+            return artifact
+
+        # (code, feedback, history) digests -> CodeWriterAgent.improve_code result, scoped to this run
+        # and kept in least-recently-used order so long runs stay bounded.
+        improve_code_cache: OrderedDict[tuple[str, str, str], dict] = OrderedDict()
+        # Feedback behind every earlier improve_code request this run, oldest first.
+        improve_history: list[dict] = []
+        # Opt-in (AGENTIC_EXECUTION_CACHE=1): successful local executions are remembered across runs,
+        # keyed on the code and conda env, so identical code is not re-run. A hit runs nothing, so
+        # the script's outputs are not produced again in this run's directory.
+        use_execution_cache = not use_hpc and os.environ.get("AGENTIC_EXECUTION_CACHE", "").lower() in {
+            "1",
+            "true",
+            "yes",
+        }
+        execution_cache_path = workspace_root / ".execution_cache.jsonl"
+        execution_cache: dict[str, dict] = (
+            await _to_thread(
+                utils.load_execution_cache,
+                execution_cache_path,
+                _EXECUTION_CACHE_ENTRIES,
+                executor=executor,
+            )
+            if use_execution_cache
+            else {}
+        )
+
+        async def _improve_code(
+            code: str, feedback: str, iteration: int, use_cache: bool = True
+        ) -> tuple[dict, bool]:
+            """Return the improved code dict and whether it was replayed from the cache."""
+            # The history is part of the prompt, so it is part of the key too.
+            history = improve_history[-_IMPROVE_HISTORY_ENTRIES:]
+            key = (_digest(code), _digest(feedback), _digest(repr(history)))
+            cached = improve_code_cache.get(key) if use_cache else None
+            if cached is not None:
+                improve_code_cache.move_to_end(key)
+                _log_event(
+                    "CodeWriterAgent",
+                    "Reused cached improvement for identical code, feedback and history.",
+                    iteration,
+                )
+                return {**cached, "iteration": iteration}, True
+            improved_dict = await code_writer.improve_code(
+                code=code,
+                feedback=feedback,
+                iteration=iteration,
+                history=history,
+            )
+            improve_code_cache[key] = improved_dict
+            if len(improve_code_cache) > _IMPROVE_CACHE_ENTRIES:
+                improve_code_cache.popitem(last=False)
+            improve_history.append(
+                {"iteration": iteration, "feedback": _preview(feedback, _IMPROVE_HISTORY_CHARS)}
+            )
+            return improved_dict, False
+
+        async def _execute_code(code: str, iteration: int, attempt: int) -> dict:
+            key = f"{_digest(code)}:{conda_env or ''}"
+            cached = execution_cache.get(key)
+            if cached is not None:
+                print(
+                    "CodeExecutorAgent: reusing a cached successful execution; the script was not run, "
+                    "so this run directory holds no new outputs from it."
+                )
+                _log_event(
+                    "CodeExecutorAgent",
+                    "Reused cached successful execution for identical code; no run artifacts produced.",
+                    iteration,
+                    {"attempt": attempt},
+                )
+                return cached
+            exec_dict = await code_executor.execute_code(
+                code=code,
+                working_directory=str(run_dir),
+                iteration=iteration,
+                conda_env_path=conda_env,
+            )
+            if use_execution_cache and exec_dict.get("success"):
+                # Store the same head/tail excerpt the prompts see rather than the full output.
+                record = {
+                    **exec_dict,
+                    "stdout": _truncate_middle(exec_dict.get("stdout")),
+                    "stderr": _truncate_middle(exec_dict.get("stderr")),
+                }
+                execution_cache[key] = record
+                if len(execution_cache) > _EXECUTION_CACHE_ENTRIES:
+                    del execution_cache[next(iter(execution_cache))]
+                await _to_thread(
+                    utils.append_execution_cache, execution_cache_path, key, record, executor=executor
+                )
+            return exec_dict
 
-        for iteration in range(MAX_ROUNDS):
+        for iteration in range(start_iteration, MAX_ROUNDS):
             print("=" * 80)
             print(f"Iteration {iteration + 1}/{MAX_ROUNDS}")
             print("=" * 80)
@@ -205,277 +725,369 @@ async def run_workflow(
                 "Orchestrator",
                 "Starting iteration.",
                 iteration,
-                {"max_rounds": MAX_ROUNDS, "plan_excerpt": plan.plan[:400]},
+                {"max_rounds": MAX_ROUNDS, "plan_excerpt": _preview(plan.plan, _PLAN_EXCERPT_CHARS)},
             )
             executor_reasoning_note = "Code path not executed this iteration."
 
-            if mode in {"research_only", "both"}:
-                if iteration == 0 or not research_result:
-                    research_dict = await research.draft_document(
-                        sources=sources,
-                        topic=topic,
-                        plan_section=plan.plan,
-                        iteration=iteration,
-                    )
-                else:
-                    feedback = critic_feedback.document_feedback if critic_feedback else ""
-                    research_dict = await research.improve_document(
-                        draft=research_result.content,
-                        feedback=feedback or "",
-                        iteration=iteration,
-                    )
-                research_result = ResearchArtifact.from_dict(research_dict)
-                _log_event(
-                    "ResearchAgent",
-                    "Produced research draft.",
-                    iteration,
-                    {"iteration": research_result.iteration, "excerpt": research_result.content[:600]},
+            run_research = mode in {"research_only", "both"}
+            run_code = mode in {"code_only", "both"}
+
+            # Settle the interactive coding-plan approval before any concurrent agent work starts.
+            coding_plan: str | None = None
+            if run_code and (iteration == 0 or not code_artifact):
+                coding_plan = await code_writer.create_coding_plan(
+                    None, topic, plan.plan, sources_path=sources_ref
                 )
+                print("\n" + "=" * 80)
+                print("CodeWriterAgent proposed coding plan:\n")
+                print(coding_plan.strip())
+                print("=" * 80 + "\n")
+                while True:
+                    approved = (await _ainput("CodeWriter: Approve coding plan? (y/n): ")).strip().lower()
+                    if approved == "y":
+                        break
+                    if approved == "n":
+                        feedback = await _ainput("Provide feedback for coding plan: ")
+                        coding_plan = await code_writer.improve_coding_plan(feedback, coding_plan)
+                        print("\n" + "=" * 80)
+                        print("CodeWriterAgent improved coding plan:\n")
+                        print(coding_plan.strip())
+                        print("=" * 80 + "\n")
+                    else:
+                        print("Invalid input. Please respond with y/n.")
 
-            if mode in {"code_only", "both"}:
-                executor_reasoning_note = "Awaiting execution results."
-                if iteration == 0 or not code_artifact:
-                    coding_plan = await code_writer.create_coding_plan(sources, topic, plan.plan)
-                    print("\n" + "=" * 80)
-                    print("CodeWriterAgent proposed coding plan:\n")
-                    print(coding_plan.strip())
-                    print("=" * 80 + "\n")
-                    while True:
-                        approved = (
-                            await _to_thread(input, "CodeWriter: Approve coding plan? (y/n): ")
-                        ).strip().lower()
-                        if approved == "y":
-                            break
-                        if approved == "n":
-                            feedback = await _to_thread(input, "Provide feedback for coding plan: ")
-                            coding_plan = await code_writer.improve_coding_plan(feedback, coding_plan)
-                            print("\n" + "=" * 80)
-                            print("CodeWriterAgent improved coding plan:\n")
-                            print(coding_plan.strip())
-                            print("=" * 80 + "\n")
-                        else:
-                            print("Invalid input. Please respond with y/n.")
-                    code_dict = await code_writer.create_code(
-                        sources=sources,
-                        topic=topic,
-                        plan_section=plan.plan,
-                        coding_plan=coding_plan,
-                        iteration=iteration,
-                    )
-                else:
-                    feedback_sections: list[str] = []
-                    if critic_feedback and critic_feedback.executor_feedback:
-                        feedback_sections.append(f"Executor diagnostics:\n{critic_feedback.executor_feedback}")
-                    if critic_feedback and critic_feedback.code_feedback:
-                        feedback_sections.append(critic_feedback.code_feedback)
-                    feedback = "\n\n".join(feedback_sections)
-                    code_dict = await code_writer.improve_code(
-                        code=code_artifact.code,
-                        feedback=feedback or "",
-                        iteration=iteration,
-                    )
-                code_artifact = CodeArtifact.from_dict(code_dict)
-                _log_event(
-                    "CodeWriterAgent",
-                    "Produced code artifact.",
-                    iteration,
-                    {"iteration": code_artifact.iteration, "code_preview": code_artifact.code[:600]},
+            # Research drafting does not depend on the code path, so it runs alongside coding and execution.
+            research_task = (
+                asyncio.create_task(
+                    _research_step(iteration, plan.plan, research_result, critic_feedback)
                 )
+                if run_research
+                else None
+            )
 
-                execution_result: ExecutionResult | None = None
-                execution_transcript = ""
-
-                if use_hpc:
-                    if not hpc_agent:
-                        raise RuntimeError("HPCAgent not initialized despite --use_hpc flag.")
-                    for attempt in range(1, MAX_EXECUTION_ATTEMPTS + 1):
-                        script_path = _materialize_hpc_script(code_artifact.code, iteration)
-                        exec_dict = await hpc_agent.submit_job(
-                            script_path=str(script_path),
-                            working_directory=str(run_dir),
+            # If the code path fails, stop the concurrent research call before the runtime is torn down.
+            try:
+                if run_code:
+                    executor_reasoning_note = "Awaiting execution results."
+                    if coding_plan is not None:
+                        code_dict = await code_writer.create_code(
+                            sources=None,
+                            sources_path=sources_ref,
+                            topic=topic,
+                            plan_section=plan.plan,
+                            coding_plan=coding_plan,
                             iteration=iteration,
-                            code=code_artifact.code,
-                            conda_env_path=conda_env,
-                        )
-                        execution_result = ExecutionResult.from_dict(exec_dict)
-                        executor_reasoning_note = (
-                            execution_result.reasoning
-                            or "HPC job submitted; awaiting cluster execution results."
                         )
-                        execution_transcript = (
-                            f"HPC attempt {attempt}: success={execution_result.success}\n"
-                            f"JOB_ID: {execution_result.job_id or 'unknown'}\n"
-                            f"STDOUT:\n{execution_result.stdout}\n\n"
-                            f"STDERR:\n{execution_result.stderr}\n"
-                        )
-                        _log_event(
-                            "HPCAgent",
-                            "HPC attempt completed.",
-                            iteration,
-                            {
-                                "attempt": attempt,
-                                "job_id": execution_result.job_id,
-                                "success": execution_result.success,
-                                "reasoning": execution_result.reasoning,
-                                "error_type": execution_result.error_type,
-                                "stdout": execution_result.stdout[:1000],
-                                "stderr": execution_result.stderr[:1000],
-                            },
+                    else:
+                        executor_fb = critic_feedback.executor_feedback if critic_feedback else None
+                        code_fb = critic_feedback.code_feedback if critic_feedback else None
+                        feedback_sections: list[str] = []
+                        if executor_fb:
+                            feedback_sections.append(_EXECUTOR_DIAGNOSTICS_HEADER + executor_fb)
+                        if code_fb:
+                            feedback_sections.append(code_fb)
+                        feedback = "\n\n".join(feedback_sections)
+                        # A cached result here would be code an earlier round already ran and saw fail,
+                        # so this refinement always asks the writer afresh.
+                        code_dict, _ = await _improve_code(
+                            code=code_artifact.code,
+                            feedback=feedback or "",
+                            iteration=iteration,
+                            use_cache=False,
                         )
+                    code_artifact = CodeArtifact.from_dict(code_dict)
+                    _log_event(
+                        "CodeWriterAgent",
+                        "Produced code artifact.",
+                        iteration,
+                        {"iteration": code_artifact.iteration, "code_preview": _preview(code_artifact.code)},
+                    )
+
+                    execution_result: ExecutionResult | None = None
+                    execution_transcript = ""
+                    # One rendered transcript per attempt; retry feedback only repeats the last few.
+                    transcript_chunks: list[str] = []
 
-                        if execution_result.error_type == "hpc_submission_pending":
-                            print(
-                                "HPCAgent monitoring window ended while the job is still queued; please monitor it manually."
+                    if use_hpc:
+                        if not hpc_agent:
+                            raise RuntimeError("HPCAgent not initialized despite --use_hpc flag.")
+                        for attempt in range(1, MAX_EXECUTION_ATTEMPTS + 1):
+                            script_path = _materialize_hpc_script(code_artifact.code, iteration)
+                            exec_dict = await hpc_agent.submit_job(
+                                script_path=str(script_path),
+                                working_directory=str(run_dir),
+                                iteration=iteration,
+                                code=code_artifact.code,
+                                conda_env_path=conda_env,
+                            )
+                            execution_result = ExecutionResult.from_dict(exec_dict)
+                            executor_reasoning_note = (
+                                execution_result.reasoning
+                                or "HPC job submitted; awaiting cluster execution results."
+                            )
+                            execution_transcript = _hpc_transcript(execution_result, attempt)
+                            transcript_chunks.append(execution_transcript)
+                            _log_event(
+                                "HPCAgent",
+                                "HPC attempt completed.",
+                                iteration,
+                                {
+                                    "attempt": attempt,
+                                    "job_id": execution_result.job_id,
+                                    "success": execution_result.success,
+                                    "reasoning": execution_result.reasoning,
+                                    "error_type": execution_result.error_type,
+                                    "stdout": _preview(execution_result.stdout, _STREAM_PREVIEW_CHARS),
+                                    "stderr": _preview(execution_result.stderr, _STREAM_PREVIEW_CHARS),
+                                },
                             )
-                            break
 
-                        if execution_result.success:
-                            break
+                            if execution_result.error_type == "hpc_submission_pending":
+                                print(
+                                    "HPCAgent monitoring window ended while the job is still queued; please monitor it manually."
+                                )
+                                break
 
-                        reasoning_text = execution_result.reasoning or "No automated reasoning available."
-                        print("HPCAgent analysis of failure:\n", reasoning_text, "\n")
+                            if execution_result.success:
+                                break
 
-                        feedback = (
-                            f"The HPC execution attempt {attempt}/{MAX_EXECUTION_ATTEMPTS} failed.\n"
-                            "Executor analysis:\n"
-                            f"{reasoning_text}\n\n"
-                            "Execution transcript:\n"
-                            f"{execution_transcript}"
-                        )
+                            fatal_signature = _fatal_failure_signature(execution_result.stderr)
+                            if fatal_signature:
+                                print(
+                                    f"HPCAgent: '{fatal_signature}' cannot be fixed by code changes; skipping retries."
+                                )
+                                _log_event(
+                                    "Orchestrator",
+                                    "Skipped remaining execution attempts after a known-fatal failure.",
+                                    iteration,
+                                    {"attempt": attempt, "fatal_signature": fatal_signature},
+                                )
+                                break
 
-                        improved_dict = await code_writer.improve_code(
-                            code=code_artifact.code,
-                            feedback=feedback,
-                            iteration=iteration,
-                        )
-                        improved_artifact = CodeArtifact.from_dict(improved_dict)
+                            reasoning_text = execution_result.reasoning or "No automated reasoning available."
+                            print("HPCAgent analysis of failure:\n", reasoning_text, "\n")
+
+                            feedback = (
+                                f"The HPC execution attempt {attempt}/{MAX_EXECUTION_ATTEMPTS} failed.\n"
+                                "Executor analysis:\n"
+                                f"{reasoning_text}\n\n"
+                                "Execution transcript:\n"
+                                f"{_retry_transcript(transcript_chunks)}"
+                            )
 
-                        if improved_artifact.code == code_artifact.code:
-                            break
+                            improved_dict, from_cache = await _improve_code(
+                                code=code_artifact.code,
+                                feedback=feedback,
+                                iteration=iteration,
+                            )
+                            if from_cache:
+                                # This run already tried that fix for this exact failure; re-running it
+                                # cannot help, so hand over to the reviewer fallback below.
+                                break
+                            improved_artifact = CodeArtifact.from_dict(improved_dict)
 
-                        code_artifact = improved_artifact
-                        _log_event(
-                            "CodeWriterAgent",
-                            "Refined code artifact after HPC feedback.",
-                            iteration,
-                            {"code_preview": code_artifact.code[:600]},
-                        )
-                else:
-                    for attempt in range(1, MAX_EXECUTION_ATTEMPTS + 1):
-                        exec_dict = await code_executor.execute_code(
-                            code=code_artifact.code,
-                            working_directory=str(run_dir),
-                            iteration=iteration,
-                            conda_env_path=conda_env,
-                        )
-                        execution_result = ExecutionResult.from_dict(exec_dict)
-                        executor_reasoning_note = (
-                            execution_result.reasoning
-                            or f"Execution attempt {attempt} "
-                            f"{'succeeded' if execution_result.success else 'failed without detailed reasoning.'}"
-                        )
+                            if improved_artifact.code == code_artifact.code:
+                                break
 
-                        execution_transcript = (
-                            f"SUCCESS: {execution_result.success}\n"
-                            f"STDOUT:\n{execution_result.stdout}\n\n"
-                            f"STDERR:\n{execution_result.stderr}\n\n"
-                            f"PACKAGES_INSTALLED: {execution_result.packages_installed or []}\n"
-                        )
-                        _log_event(
-                            "CodeExecutorAgent",
-                            "Execution attempt completed.",
-                            iteration,
-                            {
-                                "attempt": attempt,
-                                "success": execution_result.success,
-                                "reasoning": execution_result.reasoning,
-                                "stdout": execution_result.stdout[:1000],
-                                "stderr": execution_result.stderr[:1000],
-                            },
-                        )
+                            code_artifact = improved_artifact
+                            _log_event(
+                                "CodeWriterAgent",
+                                "Refined code artifact after HPC feedback.",
+                                iteration,
+                                {"code_preview": _preview(code_artifact.code)},
+                            )
+                    else:
+                        for attempt in range(1, MAX_EXECUTION_ATTEMPTS + 1):
+                            exec_dict = await _execute_code(code_artifact.code, iteration, attempt)
+                            execution_result = ExecutionResult.from_dict(exec_dict)
+                            executor_reasoning_note = (
+                                execution_result.reasoning
+                                or f"Execution attempt {attempt} "
+                                f"{'succeeded' if execution_result.success else 'failed without detailed reasoning.'}"
+                            )
 
-                        if execution_result.success:
-                            break
+                            execution_transcript = _local_transcript(execution_result)
+                            transcript_chunks.append(f"Attempt {attempt}:\n{execution_transcript}")
+                            _log_event(
+                                "CodeExecutorAgent",
+                                "Execution attempt completed.",
+                                iteration,
+                                {
+                                    "attempt": attempt,
+                                    "success": execution_result.success,
+                                    "reasoning": execution_result.reasoning,
+                                    "stdout": _preview(execution_result.stdout, _STREAM_PREVIEW_CHARS),
+                                    "stderr": _preview(execution_result.stderr, _STREAM_PREVIEW_CHARS),
+                                },
+                            )
 
-                        reasoning_text = execution_result.reasoning or "No automated reasoning available."
-                        print("CodeExecutorAgent analysis of failure:\n", reasoning_text, "\n")
+                            if execution_result.success:
+                                break
 
-                        feedback = (
-                            f"The execution attempt {attempt}/{MAX_EXECUTION_ATTEMPTS} failed.\n"
-                            "Executor analysis:\n"
-                            f"{reasoning_text}\n\n"
-                            "Execution transcript:\n"
-                            f"{execution_transcript}"
-                        )
+                            fatal_signature = _fatal_failure_signature(execution_result.stderr)
+                            if fatal_signature:
+                                print(
+                                    f"CodeExecutorAgent: '{fatal_signature}' cannot be fixed by code changes; "
+                                    "skipping retries."
+                                )
+                                _log_event(
+                                    "Orchestrator",
+                                    "Skipped remaining execution attempts after a known-fatal failure.",
+                                    iteration,
+                                    {"attempt": attempt, "fatal_signature": fatal_signature},
+                                )
+                                break
 
-                        improved_dict = await code_writer.improve_code(
-                            code=code_artifact.code,
-                            feedback=feedback,
-                            iteration=iteration,
-                        )
-                        improved_artifact = CodeArtifact.from_dict(improved_dict)
-
-                        if improved_artifact.code == code_artifact.code:
-                            # No progress from code writer; rely on reviewer fallback below.
-                            break
-
-                        code_artifact = improved_artifact
-                        _log_event(
-                            "CodeWriterAgent",
-                            "Refined code artifact after executor feedback.",
-                            iteration,
-                            {"code_preview": code_artifact.code[:600]},
-                        )
+                            reasoning_text = execution_result.reasoning or "No automated reasoning available."
+                            print("CodeExecutorAgent analysis of failure:\n", reasoning_text, "\n")
 
-                        # set_trace()
+                            feedback = (
+                                f"The execution attempt {attempt}/{MAX_EXECUTION_ATTEMPTS} failed.\n"
+                                "Executor analysis:\n"
+                                f"{reasoning_text}\n\n"
+                                "Execution transcript:\n"
+                                f"{_retry_transcript(transcript_chunks)}"
+                            )
 
-                if execution_result and not execution_result.success:
-                    allow_reviewer = (
-                        not use_hpc
-                        or execution_result.error_type in {"hpc_job_failed", "hpc_submission_failed"}
-                    )
-                    if allow_reviewer:
-                        review = await code_reviewer.review_code(code_artifact.code, execution_transcript)
-                        improved_code = utils.extract_code_only(review)
-                        if improved_code and improved_code != code_artifact.code:
-                            code_artifact = CodeArtifact(code=improved_code, iteration=iteration)
+                            improved_dict, from_cache = await _improve_code(
+                                code=code_artifact.code,
+                                feedback=feedback,
+                                iteration=iteration,
+                            )
+                            if from_cache:
+                                # This run already tried that fix for this exact failure; re-running it
+                                # cannot help, so hand over to the reviewer fallback below.
+                                break
+                            improved_artifact = CodeArtifact.from_dict(improved_dict)
+
+                            if improved_artifact.code == code_artifact.code:
+                                # No progress from code writer; rely on reviewer fallback below.
+                                break
+
+                            code_artifact = improved_artifact
                             _log_event(
-                                "CodeReviewerAgent",
-                                "Reviewer adjusted code after failed execution.",
+                                "CodeWriterAgent",
+                                "Refined code artifact after executor feedback.",
                                 iteration,
-                                {"code_preview": code_artifact.code[:600]},
+                                {"code_preview": _preview(code_artifact.code)},
                             )
 
-            else:
-                execution_transcript = None
-                executor_reasoning_note = "Code path skipped due to selected mode."
-
-            critic_dict = await critic.review_iteration(
-                report=research_result.content if research_result else None,
-                code=code_artifact.code if code_artifact else None,
-                execution_result=execution_transcript,
-                execution_reasoning=executor_reasoning_note,
-                sources=sources,
+                    if execution_result and not execution_result.success:
+                        allow_reviewer = (
+                            not use_hpc
+                            or execution_result.error_type in {"hpc_job_failed", "hpc_submission_failed"}
+                        )
+                        if allow_reviewer:
+                            review = await code_reviewer.review_code(code_artifact.code, execution_transcript)
+                            improved_code = utils.extract_code_only(review)
+                            if improved_code and improved_code != code_artifact.code:
+                                code_artifact = CodeArtifact(code=improved_code, iteration=iteration)
+                                _log_event(
+                                    "CodeReviewerAgent",
+                                    "Reviewer adjusted code after failed execution.",
+                                    iteration,
+                                    {"code_preview": _preview(code_artifact.code)},
+                                )
+
+                else:
+                    execution_transcript = None
+                    executor_reasoning_note = "Code path skipped due to selected mode."
+
+                if research_task:
+                    research_result = await research_task
+            finally:
+                if research_task and not research_task.done():
+                    research_task.cancel()
+                    await asyncio.gather(research_task, return_exceptions=True)
+
+            # Bind this iteration's artifacts once; the save, critic key and critic call all use them.
+            report_text = research_result.content if research_result else None
+            code_text = code_artifact.code if code_artifact else None
+            # Prompts get the truncated transcript; the saved outputs and state keep the full one.
+            full_transcript = None
+            if execution_result is not None:
+                full_transcript = (
+                    _hpc_transcript(execution_result, attempt, truncate=False)
+                    if use_hpc
+                    else _local_transcript(execution_result, truncate=False)
+                )
+
+            # Artifacts depend on neither the critique nor the refreshed plan, so save them meanwhile.
+            pending_saves.append(
+                asyncio.create_task(
+                    _save_iteration_outputs(
+                        iteration,
+                        report_text or "",
+                        code_text or "",
+                        full_transcript or "",
+                    )
+                )
             )
-            critic_feedback = CritiqueBundle.from_dict(critic_dict)
-            _log_event(
-                "CriticAgent",
-                "Provided iteration critique.",
-                iteration,
-                {
-                    "document_feedback": critic_feedback.document_feedback,
-                    "code_feedback": critic_feedback.code_feedback,
-                    "summary": critic_feedback.summary,
-                    "executor_feedback": getattr(critic_feedback, "executor_feedback", None),
-                },
+
+            # The critique only feeds the next round's plan, so skip it when no round follows
+            # unless the user asked for a final critique.
+            last_round = (
+                iteration + 1 >= MAX_ROUNDS
+                or bool(execution_result and execution_result.success)
+                or bool(
+                    use_hpc
+                    and execution_result
+                    and execution_result.error_type == "hpc_submission_pending"
+                )
             )
+            if final_critique or not last_round:
+                critic_key = (
+                    _digest(report_text or ""),
+                    _digest(code_text or ""),
+                    _digest(execution_transcript or ""),
+                    _digest(executor_reasoning_note or ""),
+                )
+                cached_critique = critic_cache.get(critic_key)
+                if cached_critique is not None:
+                    critic_feedback = cached_critique
+                    _log_event(
+                        "CriticAgent",
+                        "Inputs match an earlier critique this run; reusing it.",
+                        iteration,
+                    )
+                else:
+                    critic_dict = await critic.review_iteration(
+                        report=report_text,
+                        code=code_text,
+                        execution_result=execution_transcript,
+                        execution_reasoning=executor_reasoning_note,
+                        sources=None,
+                        sources_path=sources_ref,
+                    )
+                    critic_feedback = CritiqueBundle.from_dict(critic_dict)
+                    _log_event(
+                        "CriticAgent",
+                        "Provided iteration critique.",
+                        iteration,
+                        {
+                            "document_feedback": critic_feedback.document_feedback,
+                            "code_feedback": critic_feedback.code_feedback,
+                            "summary": critic_feedback.summary,
+                            "executor_feedback": getattr(critic_feedback, "executor_feedback", None),
+                        },
+                    )
+                    critic_cache[critic_key] = critic_feedback
 
             # Refresh the PI’s plan for the next iteration using the latest critic feedback.
-            if iteration + 1 < MAX_ROUNDS:
+            if not last_round:
                 plan_changes = _format_pi_changes(critic_feedback)
-                if plan_changes:
+                replan_key = _digest(plan_changes) if plan_changes else None
+                if plan_changes and replan_key == last_replan_key:
+                    # The plan already reflects this exact critique; replanning would cost a call for nothing.
+                    _log_event(
+                        "PrincipalInvestigatorAgent",
+                        "Critique unchanged since the last replan; keeping the current plan.",
+                        iteration,
+                    )
+                elif plan_changes:
                     plan_dict = await pi.create_plan(
-                        sources=sources,
+                        sources=None,
+                        sources_path=sources_ref,
                         topic=topic,
                         mode=mode,
                         changes=plan_changes,
@@ -487,19 +1099,23 @@ async def run_workflow(
                         iteration,
                         {"plan": plan.plan, "changes": plan_changes},
                     )
+                    last_replan_key = replan_key
 
-            utils.save_output(
-                report=research_result.content if research_result else "",
-                code=code_artifact.code if code_artifact else "",
-                execution_result=execution_transcript or (execution_result.stdout if execution_result else ""),
-                timestamp=timestamp,
-                iteration=iteration,
-            )
-            _log_event(
-                "Orchestrator",
-                "Saved iteration artifacts.",
-                iteration,
-                {"timestamp": timestamp},
+            # Record the finished round so a crashed or interrupted run can resume after it; the
+            # last round (success, pending HPC job or spent budget) is marked so it is not resumed.
+            await _to_thread(
+                utils.append_iteration_state,
+                state_path,
+                {
+                    "iteration": iteration,
+                    "plan": plan.to_dict(),
+                    "research": research_result.to_dict() if research_result else None,
+                    "code": code_artifact.to_dict() if code_artifact else None,
+                    "execution_transcript": full_transcript,
+                    "critic": critic_feedback.to_dict() if critic_feedback else None,
+                    "completed": last_round,
+                },
+                executor=executor,
             )
 
             if execution_result and execution_result.success:
@@ -509,5 +1125,28 @@ async def run_workflow(
             if use_hpc and execution_result and execution_result.error_type == "hpc_submission_pending":
                 print("HPC job is still queued or monitoring timed out; please watch the cluster queue.")
                 break
-
-    executor.shutdown(wait=False)
+    finally:
+        if ingestion is not None and not ingestion.done():
+            ingestion.cancel()
+        for task in config_tasks:
+            if not task.done():
+                task.cancel()
+        # Retrieve every outcome so an early failure leaves no orphaned task calling into the runtime.
+        await asyncio.gather(
+            *config_tasks, *([ingestion] if ingestion is not None else []), return_exceptions=True
+        )
+        for outcome in await asyncio.gather(*pending_saves, return_exceptions=True):
+            if isinstance(outcome, Exception):
+                print(f"Warning: failed to save iteration outputs: {outcome}")
+        # The sentinel follows every queued event, so the writer drains the queue before it exits.
+        log_queue.put_nowait(None)
+        try:
+            await log_writer_task
+        except Exception as exc:
+            print(f"Warning: failed to write the conversation log: {exc}")
+        conversation_log_handle.close()
+        log_executor.shutdown(wait=True)
+        if owns_runtime:
+            await runtime.aclose()
+        # A prompt abandoned mid-input keeps its thread blocked in input(), so this one is not joined.
+        console_executor.shutdown(wait=False)